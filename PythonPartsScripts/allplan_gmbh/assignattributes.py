@@ -3,6 +3,8 @@ Assign Object Attributes to Rebar
 v1.0 - created on 10/06/2025 by Bert Van Overmeir.
 """
 
+import time
+
 from typing import Any, List, TYPE_CHECKING, cast
 from enum import Enum
 
@@ -25,6 +27,8 @@ from CreateElementResult import CreateElementResult
 import Utils.LibraryBitmapPreview
 from BuildingElementAttributeList import BuildingElementAttributeList
 from ControlPropertiesUtil import ControlPropertiesUtil
+from allplan_gmbh.containment import get_point_fraction_inside, get_length_fraction_inside, select_best_candidate, \
+                                     get_bounding_box, is_bounding_box_overlapping
 
 
 def create_preview(_build_ele: BuildingElement,
@@ -83,6 +87,11 @@ class ApplicationStates(Enum):
     ERROR_UNSUPPORTED_REBAR_SHAPE = 9
 
 
+class ContainmentMode(Enum):
+    POINT_COUNT = 0
+    LENGTH_WEIGHTED = 1
+
+
 class SelectionType(Enum):
     NONE = 0
     SINGLE_SELECTION = 1
@@ -296,28 +305,46 @@ class AssignAttributesInteractor():
 
                 # create the rebar element containers
                 AllplanHelpers.log("[FormworkToRebarAttributes]","Calculating global reference points for rebar shapes",False)
+                rebar_mark_cache = {} # parent element uuid -> rebar mark, only valid for this run
+                extraction_start = time.perf_counter()
                 found_unsupported_rebar  = False
                 for reinforcement_object in selection_reinforcement:
-                    temp_rebar = RebarContainer(reinforcement_object)
+                    temp_rebar = RebarContainer(reinforcement_object, rebar_mark_cache)
                     if temp_rebar.get_global_reference():
                         rebar_container_list.append(temp_rebar)
                     else:
                         AllplanHelpers.log("[FormworkToRebarAttributes]","!!! shape exception for mark: " + temp_rebar.get_rebar_mark(),False)
                         found_unsupported_rebar = True
+                rebar_extraction_time = time.perf_counter() - extraction_start
 
                 if found_unsupported_rebar:
                     AllplanUtil.ShowMessageBox(AllplanHelpers.get_message(ApplicationStates.ERROR_UNSUPPORTED_REBAR_SHAPE), AllplanUtil.MB_OK)
 
                 AllplanHelpers.infinite_progressbar_start("Calculating Geometry Containment","This can take a while")
-                # create the geometric element containers and add the reinforcement containers if they are inside
+                # create the geometric element containers and add every reinforcement container to the one it is most inside
                 AllplanHelpers.log("[FormworkToRebarAttributes]","Processing rebar and geometry containment algoritm",False)
+                tolerance_percentage = float(self.attribute_settings["Tolerance"][0].value)
+                containment_mode = ContainmentMode(int(self.attribute_settings["ContainmentMode"][0].value))
+                boundary_band = float(self.attribute_settings["BoundaryBand"][0].value)
+                geometry_extraction_start = time.perf_counter()
                 for geometry_object in selection_geometry:
-                    temp_geo = GeometryContainer(geometry_object)
-                    for index, rebar_container in enumerate(rebar_container_list):
-                        if(not rebar_container.is_rebar_assigned_to_geometry()):
-                            test = temp_geo.add_rebar_if_inside(rebar_container, float(self.attribute_settings["Tolerance"][0].value))
-                            rebar_container_list[index].set_assigned_to_geometry(test)
-                    geometry_container_list.append(temp_geo)
+                    geometry_container_list.append(GeometryContainer(geometry_object))
+                geometry_extraction_time = time.perf_counter() - geometry_extraction_start
+                containment_start = time.perf_counter()
+                geometry_container_dict = {str(geometry_container.get_element_uuid()): geometry_container for geometry_container in geometry_container_list}
+                for rebar_container in rebar_container_list:
+                    candidate_list = []
+                    for geometry_uuid, geometry_container in geometry_container_dict.items():
+                        fraction_inside = geometry_container.get_fraction_inside(rebar_container, containment_mode, boundary_band)
+                        if fraction_inside > 0 and fraction_inside >= tolerance_percentage:
+                            candidate_list.append((fraction_inside, geometry_uuid))
+                    best_geometry_uuid = select_best_candidate(candidate_list)
+                    if best_geometry_uuid is not None:
+                        geometry_container_dict[best_geometry_uuid].add_rebar(rebar_container)
+                        rebar_container.set_assigned_to_geometry(True)
+                AllplanHelpers.log("[FormworkToRebarAttributes]","Rebar extraction took " + format(rebar_extraction_time, ".3f") + " s, "
+                                   "geometry extraction took " + format(geometry_extraction_time, ".3f") + " s, "
+                                   "containment took " + format(time.perf_counter() - containment_start, ".3f") + " s",False)
 
                 # assign attributes to the reinforcement in the geometry_container_list>rebar_inside_list
                 AllplanHelpers.log("[FormworkToRebarAttributes]","Transferring attributes to reinforcement",False)
@@ -342,7 +369,7 @@ class AssignAttributesInteractor():
                         success = AllplanHelpers.write_attributes_to_allplan(geometry_element.get_attached_rebar(), writable_attribute_list)
                         if not success:
                             for rb in geometry_element.get_attached_rebar():
-                                AllplanHelpers.log("[FormworkToRebarAttributes]","!!! Failure to write attributes at mark: " + str(rb.get_rebar_mark()),False)
+                                AllplanHelpers.log("[FormworkToRebarAttributes]","!!! Failure to write attributes at mark: " + rb.get_rebar_mark(),False)
                             writing_errors_list.append(geometry_element)
                     else:
                         AllplanHelpers.log("[FormworkToRebarAttributes]","!!! Attributes not initialized on element! Allright_id not available.",False)
@@ -368,10 +395,14 @@ class AssignAttributesInteractor():
             # lock user interface
             self.ctrl_prop_util.set_enable_function("Button", self.disable_variable_function)
             self.ctrl_prop_util.set_enable_function("Tolerance", self.disable_variable_function)
+            self.ctrl_prop_util.set_enable_function("ContainmentMode", self.disable_variable_function)
+            self.ctrl_prop_util.set_enable_function("BoundaryBand", self.disable_variable_function)
             self.attribute_settings["AttributeIDFilterVisibility"][0].value = 0
         else:
             self.ctrl_prop_util.set_enable_function("Button", self.enable_variable_function)
             self.ctrl_prop_util.set_enable_function("Tolerance", self.enable_variable_function)
+            self.ctrl_prop_util.set_enable_function("ContainmentMode", self.enable_variable_function)
+            self.ctrl_prop_util.set_enable_function("BoundaryBand", self.enable_variable_function)
             self.attribute_settings["AttributeIDFilterVisibility"][0].value = 1
             # workaround "list may not be empty upon visibility change" BUG
             temp_list = self.build_ele_list[0].AttributeIDFilter.value
@@ -542,9 +573,16 @@ class AllplanHelpers():
             return rebar_selection
 
     @staticmethod
-    def is_point_located_inside_geometry(geometry_element, point) -> bool:
-        test = AllplanGeometry.Comparison.DeterminePosition(geometry_element,point, 0)
-        return test
+    def is_point_located_inside_geometry(geometry_element, point, boundary_band = None) -> bool:
+        """ check if a point is inside the geometry. Without a boundary band only eInside counts.
+        With a boundary band, points on a face or within the band of a face count as inside,
+        so bars with concrete cover close to a face give the same result on every run.
+        """
+        if boundary_band is None:
+            test = AllplanGeometry.Comparison.DeterminePosition(geometry_element, point, 0)
+            return test == AllplanGeometry.eComparisionResult.eInside
+        test = AllplanGeometry.Comparison.DeterminePosition(geometry_element, point, boundary_band)
+        return test in (AllplanGeometry.eComparisionResult.eInside, AllplanGeometry.eComparisionResult.eOnBound)
 
     @staticmethod
     def get_exception_message(exc: Exception) -> str:
@@ -577,6 +615,8 @@ class AllplanHelpers():
         attribute_preferences = {}
         attribute_preferences["AttributeIDFilter"] = [palette.AttributeIDFilter]
         attribute_preferences["Tolerance"] = [palette.Tolerance]
+        attribute_preferences["ContainmentMode"] = [palette.ContainmentMode]
+        attribute_preferences["BoundaryBand"] = [palette.BoundaryBand]
         attribute_preferences["SelectionButton"] = [palette.Button]
         attribute_preferences["AttributeIDFilterVisibility"] = [palette.is_attribute_filter_visible]
         # check if all attributes are defined
@@ -619,11 +659,20 @@ class AllplanHelpers():
 
 
 class RebarContainer():
+    """Wraps a rebar placement.
+    - the parent element and the rebar mark are resolved lazily on first request
+    - rebar marks are cached per parent element in the given rebar_mark_cache, shared by all placements of that parent
+    """
 
-    def __init__(self, element_adapter):
+    def __init__(self, element_adapter, rebar_mark_cache = None):
         self.element_adapter = element_adapter
+        self.rebar_mark_cache = rebar_mark_cache
         self.global_reference = self.__calculate_global_reference()
+        self.global_points = None
+        self.bounding_box = None
         self.is_assigned_to_geometry = False
+        self.parent_element = None
+        self.rebar_mark = None
 
     def get_element_adapter(self):
         return self.element_adapter
@@ -642,6 +691,16 @@ class RebarContainer():
     def get_global_reference(self):
         return self.global_reference
 
+    def get_global_points(self):
+        if self.global_points is None and self.global_reference:
+            self.global_points = [(point.X, point.Y, point.Z) for point in self.global_reference.Points]
+        return self.global_points
+
+    def get_bounding_box(self):
+        if self.bounding_box is None and self.get_global_points():
+            self.bounding_box = get_bounding_box(self.get_global_points())
+        return self.bounding_box
+
     def set_assigned_to_geometry(self, assigned_bool):
         self.is_assigned_to_geometry = assigned_bool
 
@@ -651,57 +710,94 @@ class RebarContainer():
     def get_placement_type(self):
         return self.element_adapter.GetElementAdapterType().GetGuid()
 
+    def get_parent_element(self):
+        if self.parent_element is None:
+            self.parent_element = AllplanElementAdapter.BaseElementAdapterParentElementService.GetParentElement(self.element_adapter)
+        return self.parent_element
+
     def get_rebar_mark(self):
-        parent_element = AllplanElementAdapter.BaseElementAdapterParentElementService.GetParentElement(self.element_adapter)
-        rebarmark = AllplanElementAdapter.ReinforcementPropertiesReader.GetPositionNumber(parent_element)
-        return str(rebarmark)
+        if self.rebar_mark is None:
+            parent_element = self.get_parent_element()
+            if self.rebar_mark_cache is None or parent_element.IsNull():
+                # without a valid parent there is no key to share the mark with other placements
+                self.rebar_mark = str(AllplanElementAdapter.ReinforcementPropertiesReader.GetPositionNumber(parent_element))
+                return self.rebar_mark
+            parent_uuid = str(parent_element.GetElementUUID())
+            rebarmark = self.rebar_mark_cache.get(parent_uuid)
+            if rebarmark is None:
+                rebarmark = str(AllplanElementAdapter.ReinforcementPropertiesReader.GetPositionNumber(parent_element))
+                self.rebar_mark_cache[parent_uuid] = rebarmark
+            self.rebar_mark = rebarmark
+        return self.rebar_mark
 
     def get_placement_uuid(self):
         return self.element_adapter.GetElementUUID()
 
 
 class GeometryContainer():
+    """Wraps a 3D geometry object and collects the rebar placed inside of it.
+    - POINT_COUNT: fraction of the shape polyline points inside the geometry, points on a face count as outside
+    - LENGTH_WEIGHTED: fraction of the shape polyline length inside the geometry, points within the boundary band count as inside
+    """
+    sampling_length = 50.0 # [mm] maximum distance between two sampled points in LENGTH_WEIGHTED mode
+    crossing_resolution = 1.0 # [mm] precision of a boundary crossing in LENGTH_WEIGHTED mode
 
     def __init__(self, element_adapter):
         self.element_adapter = element_adapter
         self.global_reference = self.__calculate_global_reference()
+        self.bounding_box = self.__calculate_bounding_box()
         self.rebar_inside_list = []
 
     def get_element_adapter(self):
         return self.element_adapter
 
+    def get_element_uuid(self):
+        return self.element_adapter.GetElementUUID()
+
     def __calculate_global_reference(self):
         reference_geometry = self.element_adapter.GetGeometry()
         return reference_geometry
 
+    def __calculate_bounding_box(self):
+        """ without a bounding box every rebar is tested against this geometry
+        """
+        geometry_type = type(self.global_reference).__name__
+        try:
+            min_max = AllplanGeometry.CalcMinMax(self.global_reference)
+        except (TypeError, RuntimeError) as exc:
+            AllplanHelpers.log("[FormworkToRebarAttributes]","!!! No bounding box for geometry of type " + geometry_type + ": " + str(exc),False)
+            return None
+        if not isinstance(min_max, AllplanGeometry.MinMax3D):
+            AllplanHelpers.log("[FormworkToRebarAttributes]","!!! No bounding box for geometry of type " + geometry_type + ": "
+                               "unexpected result of type " + type(min_max).__name__,False)
+            return None
+        return [[min_max.Min.X, min_max.Min.Y, min_max.Min.Z], [min_max.Max.X, min_max.Max.Y, min_max.Max.Z]]
+
     def get_global_reference(self):
         return self.global_reference
 
+    def get_bounding_box(self):
+        return self.bounding_box
+
     def get_attached_rebar(self):
         return self.rebar_inside_list
 
-    def add_rebar_if_inside(self, rebar_container: RebarContainer, tolerance_percentage) -> bool:
-        polyline = rebar_container.get_global_reference()
-        if polyline:
-            point_count = len(polyline.Points)
-            positive_count = 0
-            for point in polyline.Points:
-                test = AllplanHelpers.is_point_located_inside_geometry(self.global_reference,point)
-                if(test == AllplanGeometry.eComparisionResult.eInside):
-                    positive_count +=1
-                else:
-                    pass
-            try:
-                percentage_inside = positive_count / point_count
-            except ZeroDivisionError:
-                percentage_inside = 0
-            if percentage_inside == 0:
-                return False
-            elif tolerance_percentage > percentage_inside:
-                return False
-            else:
-                self.rebar_inside_list.append(rebar_container)
-                return True
-        return False
+    def add_rebar(self, rebar_container: RebarContainer):
+        self.rebar_inside_list.append(rebar_container)
+
+    def get_fraction_inside(self, rebar_container: RebarContainer,
+                            containment_mode = ContainmentMode.POINT_COUNT, boundary_band = 0.0) -> float:
+        points = rebar_container.get_global_points()
+        if not points:
+            return 0
+        if containment_mode != ContainmentMode.LENGTH_WEIGHTED:
+            boundary_band = None # the band only applies to LENGTH_WEIGHTED, POINT_COUNT keeps its original results
+        if not is_bounding_box_overlapping(self.bounding_box, rebar_container.get_bounding_box(), boundary_band or 0.0):
+            return 0
+        def is_inside(point):
+            return AllplanHelpers.is_point_located_inside_geometry(self.get_global_reference(), AllplanGeometry.Point3D(*point), boundary_band)
+        if containment_mode == ContainmentMode.LENGTH_WEIGHTED:
+            return get_length_fraction_inside(points, is_inside, GeometryContainer.sampling_length, GeometryContainer.crossing_resolution)
+        return get_point_fraction_inside(points, is_inside)
 
 
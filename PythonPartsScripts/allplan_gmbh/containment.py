@@ -0,0 +1,103 @@
+"""
+Containment helpers for Assign Object Attributes to Rebar.
+Independent of the Allplan API: points are (x, y, z) tuples and the geometry is given as an is_inside(point) callable.
+"""
+
+import math
+
+
+def get_distance(start_point, end_point) -> float:
+    return math.sqrt(sum((end_point[axis] - start_point[axis]) ** 2 for axis in range(3)))
+
+
+def interpolate_point(start_point, end_point, factor):
+    return tuple(start_point[axis] + (end_point[axis] - start_point[axis]) * factor for axis in range(3))
+
+
+def get_point_fraction_inside(points, is_inside) -> float:
+    """ [Amount of points inside]/[total points]
+    """
+    if len(points) == 0:
+        return 0
+    positive_count = 0
+    for point in points:
+        if is_inside(point):
+            positive_count +=1
+    return positive_count / len(points)
+
+
+def get_length_fraction_inside(points, is_inside, sampling_length = 50.0, resolution = 1.0) -> float:
+    """ [Length of the polyline inside]/[total length]
+
+    Every segment is sampled at most sampling_length apart, so a segment may leave and enter the geometry more than once.
+    A sampled part that crosses the boundary is bisected until the crossing is known within resolution.
+    Crossings closer together than sampling_length can be missed. A polyline without length falls back to the point fraction.
+    """
+    if len(points) < 2:
+        return get_point_fraction_inside(points, is_inside)
+    total_length = 0.0
+    inside_length = 0.0
+    start_inside = is_inside(points[0])
+    for point_index in range(1, len(points)):
+        start_point = points[point_index - 1]
+        end_point = points[point_index]
+        segment_length = get_distance(start_point, end_point)
+        if segment_length == 0:
+            continue
+        total_length += segment_length
+        part_count = max(1, math.ceil(segment_length / sampling_length))
+        part_start_point = start_point
+        part_start_inside = start_inside
+        for part_index in range(1, part_count + 1):
+            part_end_point = end_point if part_index == part_count else interpolate_point(start_point, end_point, part_index / part_count)
+            part_end_inside = is_inside(part_end_point)
+            if part_start_inside and part_end_inside:
+                inside_length += segment_length / part_count
+            elif part_start_inside or part_end_inside:
+                inside_point, outside_point = (part_start_point, part_end_point) if part_start_inside else (part_end_point, part_start_point)
+                inside_length += get_distance(inside_point, find_boundary_crossing(inside_point, outside_point, is_inside, resolution))
+            part_start_point = part_end_point
+            part_start_inside = part_end_inside
+        start_inside = part_start_inside
+    if total_length == 0:
+        return get_point_fraction_inside(points, is_inside)
+    return inside_length / total_length
+
+
+def find_boundary_crossing(inside_point, outside_point, is_inside, resolution = 1.0):
+    """ bisect the segment between a point inside and a point outside until the crossing is known within resolution
+    """
+    while get_distance(inside_point, outside_point) > resolution:
+        midpoint = interpolate_point(inside_point, outside_point, 0.5)
+        if is_inside(midpoint):
+            inside_point = midpoint
+        else:
+            outside_point = midpoint
+    return interpolate_point(inside_point, outside_point, 0.5)
+
+
+def select_best_candidate(candidate_list):
+    """ candidates are (fraction, key) tuples. Returns the key with the highest fraction, the lowest key on a tie,
+    so the result does not depend on the order of the candidates. Returns None if there are no candidates.
+    """
+    if len(candidate_list) == 0:
+        return None
+    return min(candidate_list, key=lambda candidate: (-candidate[0], candidate[1]))[1]
+
+
+def get_bounding_box(points):
+    """ [[min x, min y, min z], [max x, max y, max z]] of the points
+    """
+    return [[min(point[axis] for point in points) for axis in range(3)],
+            [max(point[axis] for point in points) for axis in range(3)]]
+
+
+def is_bounding_box_overlapping(bounding_box_a, bounding_box_b, margin = 0.0) -> bool:
+    """ bounding boxes are given as [[min x, min y, min z], [max x, max y, max z]]. Unknown boxes always overlap.
+    """
+    if bounding_box_a is None or bounding_box_b is None:
+        return True
+    for axis in range(3):
+        if bounding_box_a[0][axis] > bounding_box_b[1][axis] + margin or bounding_box_b[0][axis] > bounding_box_a[1][axis] + margin:
+            return False
+    return True
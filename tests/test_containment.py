@@ -0,0 +1,107 @@
+"""
+Tests for the containment helpers on synthetic boxes.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "PythonPartsScripts"))
+
+from allplan_gmbh.containment import get_point_fraction_inside, get_length_fraction_inside, select_best_candidate, \
+                                     get_bounding_box, is_bounding_box_overlapping
+
+
+def create_box(min_point, max_point, boundary_band = 0.0, call_list = None):
+    """ is_inside callable of an axis aligned box. Points on a face or within the boundary band count as inside,
+    like DeterminePosition returning eInside or eOnBound.
+    """
+    def is_inside(point):
+        if call_list is not None:
+            call_list.append(point)
+        return all(min_point[axis] - boundary_band <= point[axis] <= max_point[axis] + boundary_band for axis in range(3))
+    return is_inside
+
+
+def test_points_on_face_are_inside():
+    box = create_box((0, 0, 0), (1000, 1000, 1000))
+    points = [(0, 500, 500), (1000, 500, 500)]
+    assert get_point_fraction_inside(points, box) == 1
+    assert get_length_fraction_inside(points, box) == pytest.approx(1)
+
+
+def test_points_inside_band_are_inside():
+    points = [(-5, 500, 500), (1005, 500, 500)]
+    assert get_length_fraction_inside(points, create_box((0, 0, 0), (1000, 1000, 1000))) < 1
+    assert get_length_fraction_inside(points, create_box((0, 0, 0), (1000, 1000, 1000), 10)) == pytest.approx(1)
+    assert get_point_fraction_inside(points, create_box((0, 0, 0), (1000, 1000, 1000), 10)) == 1
+
+
+def test_bar_crossing_boundary():
+    box = create_box((0, 0, 0), (1000, 1000, 1000))
+    points = [(250, 500, 500), (1750, 500, 500)]
+    assert get_point_fraction_inside(points, box) == 0.5
+    assert get_length_fraction_inside(points, box, 1.0) == pytest.approx(0.5, abs=1.0 / 1500)
+
+
+def test_bar_crossing_boundary_over_several_segments():
+    box = create_box((0, 0, 0), (1000, 1000, 1000))
+    points = [(100, 100, 500), (900, 100, 500), (900, 100, 2900)]
+    # 800 + 500 inside of 800 + 2400
+    assert get_length_fraction_inside(points, box, 1.0) == pytest.approx(1300 / 3200, abs=1.0 / 3200)
+
+
+def test_zero_length_segments():
+    box = create_box((0, 0, 0), (1000, 1000, 1000))
+    assert get_length_fraction_inside([(500, 500, 500), (500, 500, 500), (1500, 500, 500)], box, 1.0) == pytest.approx(0.5, abs=1.0 / 1000)
+    assert get_length_fraction_inside([(500, 500, 500), (500, 500, 500)], box) == pytest.approx(1)
+    assert get_length_fraction_inside([(1500, 500, 500), (1500, 500, 500)], box) == 0
+    assert get_length_fraction_inside([], box) == 0
+
+
+def test_bar_passing_through_solid():
+    box_list = [create_box((0, 0, 0), (500, 1000, 1000)),
+                create_box((500, 0, 0), (5500, 1000, 1000)),
+                create_box((5500, 0, 0), (6000, 1000, 1000))]
+    points = [(10, 500, 500), (5990, 500, 500)]
+    fraction_list = [get_length_fraction_inside(points, box, 50.0, 1.0) for box in box_list]
+    assert fraction_list == pytest.approx([490 / 5980, 5000 / 5980, 490 / 5980], abs=2.0 / 5980)
+
+
+def test_bar_through_concave_solid():
+    def u_shape(point):
+        return create_box((0, 0, 0), (1000, 1000, 1000))(point) or create_box((2000, 0, 0), (3000, 1000, 1000))(point)
+    points = [(500, 500, 500), (2500, 500, 500)]
+    assert get_length_fraction_inside(points, u_shape, 50.0, 1.0) == pytest.approx(0.5, abs=2.0 / 2000)
+
+
+def test_sampling_calls_are_bounded():
+    call_list = []
+    box = create_box((0, 0, 0), (6000, 1000, 1000), call_list=call_list)
+    get_length_fraction_inside([(100, 500, 500), (12100, 500, 500)], box, 50.0, 1.0)
+    # one call per sampled point plus the bisection of the one crossing part
+    assert len(call_list) <= 241 + 6
+
+
+def test_shared_face_tie_is_broken_by_uuid():
+    box_a = create_box((0, 0, 0), (1000, 1000, 1000), 10)
+    box_b = create_box((1000, 0, 0), (2000, 1000, 1000), 10)
+    points = [(1000, 100, 500), (1000, 900, 500)]
+    candidate_list = [(get_length_fraction_inside(points, box_a), "a-uuid"), (get_length_fraction_inside(points, box_b), "b-uuid")]
+    assert candidate_list[0][0] == candidate_list[1][0] == 1
+    assert select_best_candidate(candidate_list) == "a-uuid"
+    assert select_best_candidate(list(reversed(candidate_list))) == "a-uuid"
+
+
+def test_highest_fraction_wins():
+    assert select_best_candidate([(0.6, "a"), (0.9, "b")]) == "b"
+    assert select_best_candidate([]) is None
+
+
+def test_bounding_box_overlap():
+    bar_box = get_bounding_box([(1005, 100, 500), (1005, 900, 500)])
+    assert bar_box == [[1005, 100, 500], [1005, 900, 500]]
+    assert not is_bounding_box_overlapping([[0, 0, 0], [1000, 1000, 1000]], bar_box)
+    assert is_bounding_box_overlapping([[0, 0, 0], [1000, 1000, 1000]], bar_box, 10)
+    assert is_bounding_box_overlapping(None, bar_box)